@@ -0,0 +1,134 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+from aws_xray_sdk.core import patch
+
+patch(("botocore",))
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
+import os
+import json
+import random
+import time
+from aws_lambda_powertools import Logger
+
+logger = Logger(service="batch_writer")
+
+TABLE = os.environ["TABLE_NAME"]
+
+# BatchWriteItem accepts at most 25 put requests per call
+MAX_BATCH_SIZE = 25
+MAX_UNPROCESSED_RETRIES = 5
+
+# Worst case for one BatchWriteItem call under the client config below
+# (3 attempts of 1s connect + 3s read, plus backoff). Retries stop once less
+# than this is left, so the function reports failures instead of timing out
+# and having SQS redeliver the whole batch.
+MIN_REMAINING_MS = 15000
+
+_cfg = Config(
+    retries={"mode": "adaptive", "total_max_attempts": 3},
+    connect_timeout=1,
+    read_timeout=3,
+    tcp_keepalive=True,
+)
+dynamodb_client = boto3.client("dynamodb", config=_cfg)
+
+
+def to_put_request(body):
+    """Build a BatchWriteItem put request from a queued API request body.
+
+    Raises ValueError for items DynamoDB would reject, since one invalid put
+    request fails the whole BatchWriteItem call.
+    """
+    item = json.loads(body)
+    year = str(item["year"])
+    item_id = str(item["id"])
+    if not (year.isascii() and year.isdigit()):
+        raise ValueError("year must be numeric")
+    if not item_id:
+        raise ValueError("id must not be empty")
+    return {
+        "PutRequest": {
+            "Item": {
+                "year": {"N": year},
+                "title": {"S": str(item["title"])},
+                "id": {"S": item_id},
+            }
+        }
+    }
+
+
+def write_batch(requests):
+    """Write put requests to DynamoDB.
+
+    Returns the requests DynamoDB left unprocessed and the ones in calls it
+    rejected outright.
+    """
+    unprocessed = []
+    rejected = []
+    for start in range(0, len(requests), MAX_BATCH_SIZE):
+        chunk = requests[start:start + MAX_BATCH_SIZE]
+        try:
+            response = dynamodb_client.batch_write_item(RequestItems={TABLE: chunk})
+        except ClientError as e:
+            logger.error("batch_write_failed", extra={
+                "error_code": e.response["Error"]["Code"],
+                "error_message": str(e),
+                "items": len(chunk),
+            })
+            rejected.extend(chunk)
+            continue
+        unprocessed.extend(response.get("UnprocessedItems", {}).get(TABLE, []))
+    return unprocessed, rejected
+
+
+def handler(event, context):
+    failed_message_ids = []
+
+    # BatchWriteItem rejects two puts for the same key in one call, so a
+    # later message for an id replaces the earlier one, as sequential puts would.
+    requests = {}
+    message_ids = {}
+    for record in event["Records"]:
+        try:
+            request = to_put_request(record["body"])
+        except (ValueError, KeyError, TypeError):
+            logger.warning("invalid_message", extra={
+                "message_id": record["messageId"],
+            })
+            failed_message_ids.append(record["messageId"])
+            continue
+        item_id = request["PutRequest"]["Item"]["id"]["S"]
+        requests[item_id] = request
+        message_ids.setdefault(item_id, []).append(record["messageId"])
+
+    pending, failed = write_batch(list(requests.values())) if requests else ([], [])
+
+    # Retry only the unprocessed items, with jittered exponential backoff
+    for attempt in range(MAX_UNPROCESSED_RETRIES):
+        if not pending or context.get_remaining_time_in_millis() < MIN_REMAINING_MS:
+            break
+        time.sleep(random.uniform(0, 0.05 * 2 ** attempt))
+        pending, rejected = write_batch(pending)
+        failed.extend(rejected)
+
+    # Whatever was rejected or is still unprocessed goes back to the queue
+    failed.extend(pending)
+    for request in failed:
+        failed_message_ids.extend(message_ids[request["PutRequest"]["Item"]["id"]["S"]])
+
+    logger.info("batch_written", extra={
+        "table": TABLE,
+        "received": len(event["Records"]),
+        "written": len(requests) - len(failed),
+        "failed": len(failed_message_ids),
+    })
+
+    return {
+        "batchItemFailures": [
+            {"itemIdentifier": message_id} for message_id in failed_message_ids
+        ]
+    }
@@ -2,20 +2,44 @@
 # SPDX-License-Identifier: MIT-0
 
 import os
+import json
 from aws_cdk import (
     Stack,
     aws_dynamodb as dynamodb_,
     aws_lambda as lambda_,
     aws_apigateway as apigw_,
+    aws_apigatewayv2 as apigwv2,
     aws_ec2 as ec2,
     aws_iam as iam,
     aws_logs as logs,
+    aws_sqs as sqs,
+    CfnOutput,
     Duration,
 )
+from aws_cdk.aws_apigatewayv2_integrations import HttpLambdaIntegration
+from aws_cdk.aws_lambda_event_sources import SqsEventSource
 from constructs import Construct
 
 TABLE_NAME = "demo_table"
 
+# Public AWS Lambda Powertools layer. Assets aren't bundled, so this is what
+# provides aws_lambda_powertools (and aws_xray_sdk, which the layer includes)
+POWERTOOLS_LAYER_VERSION = 79
+
+# Files that should never be packaged into the Lambda assets
+ASSET_EXCLUDES = ["*.pyc", "__pycache__", "tests/*"]
+
+# Maps a validated request body onto a DynamoDB PutItem call. escapeJavaScript
+# also escapes single quotes, which aren't valid in JSON, so those are undone.
+PUT_ITEM_TEMPLATE = """{
+    "TableName": "%s",
+    "Item": {
+        "id": {"S": "$util.escapeJavaScript($input.path('$.id')).replaceAll("\\\\'", "'")"},
+        "year": {"N": "$input.path('$.year')"},
+        "title": {"S": "$util.escapeJavaScript($input.path('$.title')).replaceAll("\\\\'", "'")"}
+    }
+}"""
+
 
 class ApigwHttpApiLambdaDynamodbPythonCdkStack(Stack):
     def __init__(self, scope: Construct, construct_id: str, **kwargs) -> None:
@@ -55,23 +79,6 @@ class ApigwHttpApiLambdaDynamodbPythonCdkStack(Stack):
             vpc=vpc,
         )
 
-        # This allows to customize the endpoint policy
-        dynamo_db_endpoint.add_to_policy(
-            iam.PolicyStatement(  # Restrict to listing and describing tables
-                principals=[iam.AnyPrincipal()],
-                actions=[                "dynamodb:DescribeStream",
-                "dynamodb:DescribeTable",
-                "dynamodb:Get*",
-                "dynamodb:Query",
-                "dynamodb:Scan",
-                "dynamodb:CreateTable",
-                "dynamodb:Delete*",
-                "dynamodb:Update*",
-                "dynamodb:PutItem"],
-                resources=["*"],
-            )
-        )
-
         # Create DynamoDb Table
         demo_table = dynamodb_.Table(
             self,
@@ -80,6 +87,27 @@ class ApigwHttpApiLambdaDynamodbPythonCdkStack(Stack):
                 name="id", type=dynamodb_.AttributeType.STRING
             ),
             point_in_time_recovery=True,
+            billing_mode=dynamodb_.BillingMode.PAY_PER_REQUEST,
+        )
+
+        powertools_layer = lambda_.LayerVersion.from_layer_version_arn(
+            self,
+            "PowertoolsLayer",
+            f"arn:aws:lambda:{self.region}:017000801446:layer:"
+            f"AWSLambdaPowertoolsPythonV2:{POWERTOOLS_LAYER_VERSION}",
+        )
+
+        # Create log groups up front instead of having log_retention set
+        # retention through a custom resource on every deploy
+        api_handler_log_group = logs.LogGroup(
+            self,
+            "ApiHandlerLogs",
+            retention=logs.RetentionDays.THREE_MONTHS,
+        )
+        batch_writer_log_group = logs.LogGroup(
+            self,
+            "BatchWriterLogs",
+            retention=logs.RetentionDays.THREE_MONTHS,
         )
 
         # Create the Lambda function to receive the request
@@ -87,24 +115,122 @@ class ApigwHttpApiLambdaDynamodbPythonCdkStack(Stack):
             self,
             "ApiHandler",
             function_name="apigw_handler",
-            runtime=lambda_.Runtime.PYTHON_3_9,
-            code=lambda_.Code.from_asset("lambda/apigw-handler"),
+            runtime=lambda_.Runtime.PYTHON_3_12,
+            code=lambda_.Code.from_asset(
+                "lambda/apigw-handler", exclude=ASSET_EXCLUDES
+            ),
             handler="index.handler",
+            layers=[powertools_layer],
             vpc=vpc,
             vpc_subnets=ec2.SubnetSelection(
                 subnet_type=ec2.SubnetType.PRIVATE_ISOLATED
             ),
             memory_size=1024,
             timeout=Duration.minutes(5),
-            reserved_concurrent_executions=100,
             tracing=lambda_.Tracing.ACTIVE,
-            log_retention=logs.RetentionDays.THREE_MONTHS,
+            log_group=api_handler_log_group,
+            log_format="JSON",
+            system_log_level="WARN",
+            application_log_level="INFO",
         )
 
         # grant permission to lambda to write to demo table
         demo_table.grant_write_data(api_hanlder)
+        # DescribeEndpoints is called at init to open the connection early
+        api_hanlder.add_to_role_policy(
+            iam.PolicyStatement(
+                actions=["dynamodb:DescribeEndpoints"],
+                resources=["*"],
+            )
+        )
         api_hanlder.add_environment("TABLE_NAME", demo_table.table_name)
 
+        # Keep initialised execution environments ready so requests don't pay
+        # the VPC cold start and SDK client setup
+        api_handler_alias = lambda_.Alias(
+            self,
+            "ApiHandlerAlias",
+            alias_name="live",
+            version=api_hanlder.current_version,
+            provisioned_concurrent_executions=10,
+        )
+
+        # Queue buffering writes from the API so they can be batched
+        write_dlq = sqs.Queue(
+            self,
+            "WriteDeadLetterQueue",
+            encryption=sqs.QueueEncryption.SQS_MANAGED,
+            enforce_ssl=True,
+            retention_period=Duration.days(14),
+        )
+        write_queue = sqs.Queue(
+            self,
+            "WriteQueue",
+            encryption=sqs.QueueEncryption.SQS_MANAGED,
+            enforce_ssl=True,
+            visibility_timeout=Duration.minutes(3),
+            dead_letter_queue=sqs.DeadLetterQueue(
+                max_receive_count=3, queue=write_dlq
+            ),
+        )
+
+        # Create the Lambda function draining the queue with BatchWriteItem
+        batch_writer = lambda_.Function(
+            self,
+            "BatchWriter",
+            function_name="batch_writer",
+            runtime=lambda_.Runtime.PYTHON_3_12,
+            code=lambda_.Code.from_asset(
+                "lambda/batch-writer", exclude=ASSET_EXCLUDES
+            ),
+            handler="index.handler",
+            layers=[powertools_layer],
+            vpc=vpc,
+            vpc_subnets=ec2.SubnetSelection(
+                subnet_type=ec2.SubnetType.PRIVATE_ISOLATED
+            ),
+            memory_size=256,
+            timeout=Duration.seconds(30),
+            tracing=lambda_.Tracing.ACTIVE,
+            log_group=batch_writer_log_group,
+            log_format="JSON",
+            system_log_level="WARN",
+            application_log_level="INFO",
+            environment={"TABLE_NAME": demo_table.table_name},
+        )
+        demo_table.grant_write_data(batch_writer)
+        batch_writer.add_event_source(
+            SqsEventSource(
+                write_queue,
+                batch_size=25,
+                max_batching_window=Duration.seconds(1),
+                report_batch_item_failures=True,
+            )
+        )
+
+        # Only let the two functions write to the demo table through the endpoint
+        dynamo_db_endpoint.add_to_policy(
+            iam.PolicyStatement(
+                principals=[iam.ArnPrincipal(api_hanlder.role.role_arn)],
+                actions=["dynamodb:PutItem"],
+                resources=[demo_table.table_arn],
+            )
+        )
+        dynamo_db_endpoint.add_to_policy(
+            iam.PolicyStatement(
+                principals=[iam.ArnPrincipal(api_hanlder.role.role_arn)],
+                actions=["dynamodb:DescribeEndpoints"],
+                resources=["*"],
+            )
+        )
+        dynamo_db_endpoint.add_to_policy(
+            iam.PolicyStatement(
+                principals=[iam.ArnPrincipal(batch_writer.role.role_arn)],
+                actions=["dynamodb:BatchWriteItem"],
+                resources=[demo_table.table_arn],
+            )
+        )
+
         # Create log group for API Gateway access logs
         api_log_group = logs.LogGroup(
             self,
@@ -112,16 +238,97 @@ class ApigwHttpApiLambdaDynamodbPythonCdkStack(Stack):
             retention=logs.RetentionDays.THREE_MONTHS,
         )
 
-        # Create API Gateway with throttling limits
-        apigw_.LambdaRestApi(
+        # Create HTTP API with throttling limits
+        http_api = apigwv2.HttpApi(
             self,
             "Endpoint",
-            handler=api_hanlder,
+            default_integration=HttpLambdaIntegration(
+                "ApiHandlerIntegration", api_handler_alias
+            ),
+            create_default_stage=False,
+        )
+        stage = apigwv2.HttpStage(
+            self,
+            "DefaultStage",
+            http_api=http_api,
+            stage_name="$default",
+            auto_deploy=True,
+            throttle=apigwv2.ThrottleSettings(rate_limit=100, burst_limit=200),
+        )
+
+        # The HttpStage L2 construct doesn't expose access logging yet
+        cfn_stage = stage.node.default_child
+        cfn_stage.access_log_settings = apigwv2.CfnStage.AccessLogSettingsProperty(
+            destination_arn=api_log_group.log_group_arn,
+            format=json.dumps(
+                {
+                    "requestId": "$context.requestId",
+                    "ip": "$context.identity.sourceIp",
+                    "requestTime": "$context.requestTime",
+                    "httpMethod": "$context.httpMethod",
+                    "routeKey": "$context.routeKey",
+                    "protocol": "$context.protocol",
+                    "status": "$context.status",
+                    "responseLength": "$context.responseLength",
+                    "integrationError": "$context.integrationErrorMessage",
+                }
+            ),
+        )
+
+        # Send POST /items straight to the queue, with no Lambda in between
+        api_sqs_role = iam.Role(
+            self,
+            "ApiSqsRole",
+            assumed_by=iam.ServicePrincipal("apigateway.amazonaws.com"),
+        )
+        write_queue.grant_send_messages(api_sqs_role)
+
+        sqs_integration = apigwv2.CfnIntegration(
+            self,
+            "WriteQueueIntegration",
+            api_id=http_api.api_id,
+            integration_type="AWS_PROXY",
+            integration_subtype="SQS-SendMessage",
+            payload_format_version="1.0",
+            credentials_arn=api_sqs_role.role_arn,
+            request_parameters={
+                "QueueUrl": write_queue.queue_url,
+                "MessageBody": "$request.body",
+            },
+        )
+        apigwv2.CfnRoute(
+            self,
+            "WriteQueueRoute",
+            api_id=http_api.api_id,
+            route_key="POST /items",
+            target=f"integrations/{sqs_integration.ref}",
+        )
+
+        # Write straight from API Gateway to DynamoDB with no Lambda in between.
+        # HTTP APIs have no DynamoDB integration, so this endpoint is a REST API.
+        direct_api_role = iam.Role(
+            self,
+            "DirectApiRole",
+            assumed_by=iam.ServicePrincipal("apigateway.amazonaws.com"),
+        )
+        demo_table.grant(direct_api_role, "dynamodb:PutItem")
+
+        direct_api_log_group = logs.LogGroup(
+            self,
+            "DirectApiAccessLogs",
+            retention=logs.RetentionDays.THREE_MONTHS,
+        )
+
+        direct_api = apigw_.RestApi(
+            self,
+            "DirectEndpoint",
             deploy_options=apigw_.StageOptions(
                 throttling_rate_limit=100,
                 throttling_burst_limit=200,
                 tracing_enabled=True,
-                access_log_destination=apigw_.LogGroupLogDestination(api_log_group),
+                access_log_destination=apigw_.LogGroupLogDestination(
+                    direct_api_log_group
+                ),
                 access_log_format=apigw_.AccessLogFormat.json_with_standard_fields(
                     caller=True,
                     http_method=True,
@@ -135,3 +342,80 @@ class ApigwHttpApiLambdaDynamodbPythonCdkStack(Stack):
                 ),
             ),
         )
+
+        # Reject malformed bodies before they reach the mapping template
+        item_model = direct_api.add_model(
+            "ItemModel",
+            content_type="application/json",
+            schema=apigw_.JsonSchema(
+                schema=apigw_.JsonSchemaVersion.DRAFT4,
+                type=apigw_.JsonSchemaType.OBJECT,
+                required=["id", "year", "title"],
+                properties={
+                    "id": apigw_.JsonSchema(type=apigw_.JsonSchemaType.STRING),
+                    "year": apigw_.JsonSchema(
+                        type=[
+                            apigw_.JsonSchemaType.STRING,
+                            apigw_.JsonSchemaType.INTEGER,
+                        ],
+                        pattern="^[0-9]+$",
+                    ),
+                    "title": apigw_.JsonSchema(type=apigw_.JsonSchemaType.STRING),
+                },
+            ),
+        )
+
+        direct_api.root.add_resource("items").add_method(
+            "POST",
+            apigw_.AwsIntegration(
+                service="dynamodb",
+                action="PutItem",
+                options=apigw_.IntegrationOptions(
+                    credentials_role=direct_api_role,
+                    passthrough_behavior=apigw_.PassthroughBehavior.NEVER,
+                    request_templates={
+                        "application/json": PUT_ITEM_TEMPLATE % demo_table.table_name
+                    },
+                    integration_responses=[
+                        apigw_.IntegrationResponse(
+                            status_code="200",
+                            response_templates={
+                                "application/json": json.dumps(
+                                    {"message": "Successfully inserted data!"}
+                                )
+                            },
+                        ),
+                        apigw_.IntegrationResponse(
+                            status_code="400",
+                            selection_pattern="4\\d{2}",
+                            response_templates={
+                                "application/json": json.dumps(
+                                    {"message": "write rejected"}
+                                )
+                            },
+                        ),
+                        apigw_.IntegrationResponse(
+                            status_code="500",
+                            selection_pattern="5\\d{2}",
+                            response_templates={
+                                "application/json": json.dumps(
+                                    {"message": "write failed"}
+                                )
+                            },
+                        ),
+                    ],
+                ),
+            ),
+            request_validator=direct_api.add_request_validator(
+                "BodyValidator", validate_request_body=True
+            ),
+            request_models={"application/json": item_model},
+            method_responses=[
+                apigw_.MethodResponse(status_code="200"),
+                apigw_.MethodResponse(status_code="400"),
+                apigw_.MethodResponse(status_code="500"),
+            ],
+        )
+
+        CfnOutput(self, "ApiUrl", value=http_api.api_endpoint)
+        CfnOutput(self, "DirectApiUrl", value=direct_api.url)
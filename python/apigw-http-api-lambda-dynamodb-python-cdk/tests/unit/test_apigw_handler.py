@@ -0,0 +1,129 @@
+import base64
+import importlib.util
+import json
+import os
+from unittest import mock
+
+import boto3
+import pytest
+from botocore.exceptions import ClientError
+from botocore.stub import Stubber
+
+os.environ.setdefault("TABLE_NAME", "demo_table")
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ.setdefault("AWS_XRAY_SDK_ENABLED", "false")
+
+_spec = importlib.util.spec_from_file_location(
+    "apigw_handler",
+    os.path.join(os.path.dirname(__file__), "..", "..", "lambda", "apigw-handler", "index.py"),
+)
+apigw_handler = importlib.util.module_from_spec(_spec)
+
+# Hand the module a stubbed client so the init-time warm-up never leaves the test
+_client = boto3.client("dynamodb")
+with Stubber(_client) as _warm_up:
+    _warm_up.add_response("describe_endpoints", {"Endpoints": []})
+    with mock.patch("boto3.client", return_value=_client):
+        _spec.loader.exec_module(apigw_handler)
+    _warm_up.assert_no_pending_responses()
+
+TABLE = os.environ["TABLE_NAME"]
+
+
+class Context:
+    request_id = "test-request"
+
+
+def request(body):
+    return {
+        "requestContext": {"http": {"sourceIp": "192.0.2.1", "method": "POST", "path": "/"}},
+        "body": json.dumps(body),
+    }
+
+
+def expected_put(item_id="12", year="2023", title="kkkg"):
+    return {
+        "TableName": TABLE,
+        "Item": {"year": {"N": year}, "title": {"S": title}, "id": {"S": item_id}},
+    }
+
+
+def test_item_written():
+    with Stubber(apigw_handler.dynamodb_client) as stubber:
+        stubber.add_response("put_item", {}, expected_put())
+        response = apigw_handler.handler(
+            request({"year": "2023", "title": "kkkg", "id": "12"}), Context()
+        )
+        stubber.assert_no_pending_responses()
+
+    assert response["statusCode"] == 200
+    assert json.loads(response["body"]) == {"message": "Successfully inserted data!"}
+
+
+def test_base64_encoded_body_decoded():
+    event = request({})
+    event["body"] = base64.b64encode(
+        json.dumps({"year": "2023", "title": "kkkg", "id": "12"}).encode()
+    ).decode()
+    event["isBase64Encoded"] = True
+
+    with Stubber(apigw_handler.dynamodb_client) as stubber:
+        stubber.add_response("put_item", {}, expected_put())
+        response = apigw_handler.handler(event, Context())
+        stubber.assert_no_pending_responses()
+
+    assert response["statusCode"] == 200
+
+
+def test_throttled_write_returns_429():
+    with Stubber(apigw_handler.dynamodb_client) as stubber:
+        stubber.add_client_error("put_item", "ProvisionedThroughputExceededException")
+        response = apigw_handler.handler(
+            request({"year": "2023", "title": "kkkg", "id": "12"}), Context()
+        )
+
+    assert response["statusCode"] == 429
+    assert response["headers"]["Retry-After"] == "2"
+
+
+def test_other_client_errors_raised():
+    with Stubber(apigw_handler.dynamodb_client) as stubber:
+        stubber.add_client_error("put_item", "ValidationException")
+        with pytest.raises(ClientError):
+            apigw_handler.handler(
+                request({"year": "2023", "title": "kkkg", "id": "12"}), Context()
+            )
+
+
+def test_missing_body_rejected_without_write():
+    event = request({})
+    del event["body"]
+
+    with Stubber(apigw_handler.dynamodb_client) as stubber:
+        response = apigw_handler.handler(event, Context())
+        stubber.assert_no_pending_responses()
+
+    assert response["statusCode"] == 400
+
+
+def test_single_log_record_per_request(monkeypatch):
+    records = []
+    for level in ("info", "warning", "error"):
+        monkeypatch.setattr(
+            apigw_handler.logger,
+            level,
+            lambda msg, extra, level=level: records.append((level, msg, extra)),
+        )
+
+    with Stubber(apigw_handler.dynamodb_client) as stubber:
+        stubber.add_client_error("put_item", "ThrottlingException")
+        apigw_handler.handler(
+            request({"year": "2023", "title": "kkkg", "id": "12"}), Context()
+        )
+
+    assert len(records) == 1
+    level, msg, extra = records[0]
+    assert (level, msg) == ("warning", "handled")
+    assert extra["status_code"] == 429
+    assert extra["error_code"] == "ThrottlingException"
+    assert extra["item_id"] == "12"
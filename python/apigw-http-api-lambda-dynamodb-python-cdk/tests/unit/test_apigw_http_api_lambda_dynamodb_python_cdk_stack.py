@@ -4,8 +4,40 @@ import aws_cdk.assertions as assertions
 from stacks.apigw_http_api_lambda_dynamodb_python_cdk_stack import ApigwHttpApiLambdaDynamodbPythonCdkStack
 
 
-def test_sqs_queue_created():
+def synth_template():
     app = core.App()
     stack = ApigwHttpApiLambdaDynamodbPythonCdkStack(app, "apigw-http-api-lambda-dynamodb-python-cdk")
-    template = assertions.Template.from_stack(stack)
+    return assertions.Template.from_stack(stack)
+
+
+def test_sqs_queue_created():
+    template = synth_template()
+
+    template.resource_count_is("AWS::SQS::Queue", 2)
+    template.has_resource_properties("AWS::Lambda::EventSourceMapping", {
+        "BatchSize": 25,
+        "FunctionResponseTypes": ["ReportBatchItemFailures"],
+    })
+
+
+def test_table_on_demand():
+    template = synth_template()
+
+    template.has_resource_properties("AWS::DynamoDB::Table", {
+        "BillingMode": "PAY_PER_REQUEST",
+    })
+
+
+def test_direct_dynamodb_integration():
+    template = synth_template()
+
+    template.has_resource_properties("AWS::ApiGateway::Method", {
+        "HttpMethod": "POST",
+        "Integration": assertions.Match.object_like({"Type": "AWS"}),
+    })
+
+
+def test_no_log_retention_custom_resource():
+    template = synth_template()
 
+    template.resource_count_is("Custom::LogRetention", 0)
@@ -0,0 +1,146 @@
+import importlib.util
+import json
+import os
+
+from botocore.stub import Stubber
+
+os.environ.setdefault("TABLE_NAME", "demo_table")
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ.setdefault("AWS_XRAY_SDK_ENABLED", "false")
+
+_spec = importlib.util.spec_from_file_location(
+    "batch_writer",
+    os.path.join(os.path.dirname(__file__), "..", "..", "lambda", "batch-writer", "index.py"),
+)
+batch_writer = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(batch_writer)
+
+TABLE = os.environ["TABLE_NAME"]
+
+
+class Context:
+    request_id = "test-request"
+
+    def __init__(self, remaining_ms=30000):
+        self.remaining_ms = remaining_ms
+
+    def get_remaining_time_in_millis(self):
+        return self.remaining_ms
+
+
+def record(message_id, body):
+    return {"messageId": message_id, "body": json.dumps(body)}
+
+
+def put_request(item_id, year="2023", title="kkkg"):
+    return {
+        "PutRequest": {
+            "Item": {
+                "year": {"N": year},
+                "title": {"S": title},
+                "id": {"S": item_id},
+            }
+        }
+    }
+
+
+def failed_ids(response):
+    return sorted(f["itemIdentifier"] for f in response["batchItemFailures"])
+
+
+def test_unprocessed_items_retried_then_reported(monkeypatch):
+    monkeypatch.setattr(batch_writer, "MAX_UNPROCESSED_RETRIES", 1)
+    monkeypatch.setattr(batch_writer.time, "sleep", lambda seconds: None)
+    records = [
+        record("m1", {"id": "a", "year": "2023", "title": "kkkg"}),
+        record("m2", {"id": "b", "year": "2023", "title": "kkkg"}),
+    ]
+
+    with Stubber(batch_writer.dynamodb_client) as stubber:
+        stubber.add_response(
+            "batch_write_item",
+            {"UnprocessedItems": {TABLE: [put_request("b")]}},
+            {"RequestItems": {TABLE: [put_request("a"), put_request("b")]}},
+        )
+        # Only the unprocessed item is sent again
+        stubber.add_response(
+            "batch_write_item",
+            {"UnprocessedItems": {TABLE: [put_request("b")]}},
+            {"RequestItems": {TABLE: [put_request("b")]}},
+        )
+        response = batch_writer.handler({"Records": records}, Context())
+        stubber.assert_no_pending_responses()
+
+    assert failed_ids(response) == ["m2"]
+
+
+def test_no_retry_when_out_of_time(monkeypatch):
+    monkeypatch.setattr(batch_writer.time, "sleep", lambda seconds: None)
+    records = [record("m1", {"id": "a", "year": "2023", "title": "kkkg"})]
+
+    with Stubber(batch_writer.dynamodb_client) as stubber:
+        stubber.add_response(
+            "batch_write_item",
+            {"UnprocessedItems": {TABLE: [put_request("a")]}},
+            {"RequestItems": {TABLE: [put_request("a")]}},
+        )
+        response = batch_writer.handler(
+            {"Records": records}, Context(remaining_ms=batch_writer.MIN_REMAINING_MS - 1)
+        )
+        stubber.assert_no_pending_responses()
+
+    assert failed_ids(response) == ["m1"]
+
+
+def test_duplicate_ids_collapse_to_one_put(monkeypatch):
+    monkeypatch.setattr(batch_writer, "MAX_UNPROCESSED_RETRIES", 0)
+    records = [
+        record("m1", {"id": "a", "year": "2023", "title": "first"}),
+        record("m2", {"id": "a", "year": "2023", "title": "second"}),
+    ]
+
+    with Stubber(batch_writer.dynamodb_client) as stubber:
+        stubber.add_response(
+            "batch_write_item",
+            {"UnprocessedItems": {TABLE: [put_request("a", title="second")]}},
+            {"RequestItems": {TABLE: [put_request("a", title="second")]}},
+        )
+        response = batch_writer.handler({"Records": records}, Context())
+        stubber.assert_no_pending_responses()
+
+    assert failed_ids(response) == ["m1", "m2"]
+
+
+def test_invalid_bodies_reported_without_failing_batch():
+    records = [
+        {"messageId": "m1", "body": "not json"},
+        record("m2", {"id": "b", "year": "abc", "title": "kkkg"}),
+        record("m3", {"id": "", "year": "2023", "title": "kkkg"}),
+        record("m4", {"id": "d", "year": True, "title": "kkkg"}),
+        record("m5", {"id": "e", "year": 2023, "title": "kkkg"}),
+    ]
+
+    with Stubber(batch_writer.dynamodb_client) as stubber:
+        stubber.add_response(
+            "batch_write_item",
+            {"UnprocessedItems": {}},
+            {"RequestItems": {TABLE: [put_request("e")]}},
+        )
+        response = batch_writer.handler({"Records": records}, Context())
+        stubber.assert_no_pending_responses()
+
+    assert failed_ids(response) == ["m1", "m2", "m3", "m4"]
+
+
+def test_rejected_batch_reported_as_failures():
+    records = [
+        record("m1", {"id": "a", "year": "2023", "title": "kkkg"}),
+        record("m2", {"id": "b", "year": "2023", "title": "kkkg"}),
+    ]
+
+    with Stubber(batch_writer.dynamodb_client) as stubber:
+        stubber.add_client_error("batch_write_item", "ValidationException")
+        response = batch_writer.handler({"Records": records}, Context())
+        stubber.assert_no_pending_responses()
+
+    assert failed_ids(response) == ["m1", "m2"]